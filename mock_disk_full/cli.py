@@ -14,6 +14,12 @@ if sys.platform == "win32":
     except AttributeError:
         pass
 
+# 标准输出为管道时默认全缓冲；改为行缓冲，使 log() 不逐行 flush 也能及时输出进度信息
+try:
+    sys.stdout.reconfigure(line_buffering=True)
+except AttributeError:
+    pass
+
 # 直接运行 python mock_disk_full/cli.py 时无包上下文，改为以模块方式执行
 if __name__ == "__main__" and __package__ is None:
     import os
@@ -43,45 +49,65 @@ from .filler import (
 
 
 def log(msg: str) -> None:
-    """统一中文日志输出。"""
+    """统一中文日志输出。标准输出已在启动时设为行缓冲，无需逐行 flush。"""
     print(msg)
-    sys.stdout.flush()
+
+
+class LogBlock:
+    """成组输出多行日志：在块内收集各行，退出时一次写入并刷新标准输出。"""
+
+    def __init__(self) -> None:
+        self.lines: List[str] = []
+
+    def add(self, msg: str) -> None:
+        self.lines.append(msg)
+
+    def __enter__(self) -> "LogBlock":
+        return self
+
+    def __exit__(self, exc_type, exc, tb) -> None:
+        if self.lines:
+            sys.stdout.write("\n".join(self.lines) + "\n")
+            sys.stdout.flush()
 
 
 def log_operation_end(operation_name: str = "操作已结束") -> None:
     """输出操作结束分隔块，便于区分「执行完毕」与后续菜单。"""
-    log("")
-    log("=" * 60)
-    log(f"  【{operation_name}】")
-    log("=" * 60)
-    log("")
+    with LogBlock() as lb:
+        lb.add("")
+        lb.add("=" * 60)
+        lb.add(f"  【{operation_name}】")
+        lb.add("=" * 60)
+        lb.add("")
 
 
 def print_header() -> None:
     """打印脚本标题与版本。"""
-    log("")
-    log("=" * 60)
-    log("  模拟磁盘占满工具 (mock_disk_full)")
-    log("  跨平台支持: Windows / macOS")
-    log(f"  版本: {__version__}")
-    log("=" * 60)
-    log("")
+    with LogBlock() as lb:
+        lb.add("")
+        lb.add("=" * 60)
+        lb.add("  模拟磁盘占满工具 (mock_disk_full)")
+        lb.add("  跨平台支持: Windows / macOS")
+        lb.add(f"  版本: {__version__}")
+        lb.add("=" * 60)
+        lb.add("")
 
 
 def print_disk_list(partitions: List[DiskPartition]) -> None:
     """打印当前磁盘情况（总空间、剩余空间）。Mac 上标明 $HOME 所在分区。"""
-    log("【当前磁盘情况】")
-    log("-" * 60)
     home_part = None
     if sys.platform == "darwin":
         home_part = get_partition_by_path(os.path.expanduser("~"))
-    for i, p in enumerate(partitions, 1):
-        suffix = ""
-        if home_part and p.mount_point == home_part.mount_point:
-            suffix = "[$HOME 所在分区]"
-        log(f"  {i}. {p.__str__(suffix)}")
-    log("-" * 60)
-    log("")
+    with LogBlock() as lb:
+        lb.add("【当前磁盘情况】")
+        lb.add("-" * 60)
+        for i, p in enumerate(partitions, 1):
+            suffix = ""
+            if home_part and p.mount_point == home_part.mount_point:
+                suffix = "[$HOME 所在分区]"
+            lb.add(f"  {i}. {p.__str__(suffix)}")
+        lb.add("-" * 60)
+        lb.add("")
 
 
 def prompt_choice(
@@ -90,25 +116,39 @@ def prompt_choice(
     allow_zero: bool = False,
     invalid_exit: bool = False,
 ) -> Optional[int]:
-    """提示用户输入选项编号，返回 1-based 索引。invalid_exit 为 True 时，非预期输入直接返回 None（退出/取消），不重试。"""
+    """
+    提示用户输入选项编号，返回 1-based 索引。invalid_exit 为 True 时，非预期输入直接返回 None（退出/取消），不重试。
+    标准输入结束（EOF，如管道输入耗尽）时返回 None，避免反复提示。
+    """
     while True:
+        sys.stdout.flush()
         try:
             s = input(prompt).strip()
+        except EOFError:
+            log("")
+            return None
+        try:
             n = int(s)
+        except ValueError:
+            pass
+        else:
             if allow_zero and n == 0:
                 return 0
             if 1 <= n <= max_index:
                 return n
-        except ValueError:
-            pass
         if invalid_exit:
             return None
         log("  无效输入，请重新选择。")
 
 
 def confirm(prompt: str = "确认执行？(y/N): ") -> bool:
-    """要求用户输入 y/yes 确认。"""
-    s = input(prompt).strip().lower()
+    """要求用户输入 y/yes 确认。标准输入结束（EOF）视为未确认。"""
+    sys.stdout.flush()
+    try:
+        s = input(prompt).strip().lower()
+    except EOFError:
+        log("")
+        return False
     return s in ("y", "yes")
 
 
@@ -130,15 +170,16 @@ def run_fill(partitions: List[DiskPartition], reserve_mb: int = RESERVE_MB_DEFAU
     reserve_gb = reserve_mb / 1024
     fill_gb = free_gb - reserve_gb
 
-    log("")
-    log("【即将执行】")
-    log(f"  分区: {part.mount_point}")
-    log(f"  总空间: {part.total_gb:.2f} GB")
-    log(f"  当前剩余: {free_gb:.2f} GB")
-    log(f"  预留空间: {reserve_gb:.2f} GB")
-    log(f"  将创建填充文件约: {fill_gb:.2f} GB")
-    log(f"  填充文件路径: {filler_path}")
-    log("")
+    with LogBlock() as lb:
+        lb.add("")
+        lb.add("【即将执行】")
+        lb.add(f"  分区: {part.mount_point}")
+        lb.add(f"  总空间: {part.total_gb:.2f} GB")
+        lb.add(f"  当前剩余: {free_gb:.2f} GB")
+        lb.add(f"  预留空间: {reserve_gb:.2f} GB")
+        lb.add(f"  将创建填充文件约: {fill_gb:.2f} GB")
+        lb.add(f"  填充文件路径: {filler_path}")
+        lb.add("")
     if not confirm("确认后将在该分区创建大文件以占满磁盘，是否继续？(y/N): "):
         log("[取消] 已取消填充操作。")
         log_operation_end("填充已取消")
@@ -155,14 +196,15 @@ def run_fill(partitions: List[DiskPartition], reserve_mb: int = RESERVE_MB_DEFAU
             None,
         )
         if part_after:
-            log("")
-            log("【填充后磁盘情况】")
-            log("-" * 60)
-            log(f"  {part_after.mount_point}  | "
-                f"总空间: {part_after.total_gb:.2f} GB | "
-                f"已用: {part_after.used_gb:.2f} GB | "
-                f"剩余: {part_after.free_gb:.2f} GB")
-            log("-" * 60)
+            with LogBlock() as lb:
+                lb.add("")
+                lb.add("【填充后磁盘情况】")
+                lb.add("-" * 60)
+                lb.add(f"  {part_after.mount_point}  | "
+                       f"总空间: {part_after.total_gb:.2f} GB | "
+                       f"已用: {part_after.used_gb:.2f} GB | "
+                       f"剩余: {part_after.free_gb:.2f} GB")
+                lb.add("-" * 60)
         log_operation_end("填充操作已结束")
     else:
         log(f"[失败] {result}")
@@ -172,22 +214,21 @@ def run_fill(partitions: List[DiskPartition], reserve_mb: int = RESERVE_MB_DEFAU
 def run_remove() -> None:
     """执行释放流程：自动检查 mock 占用 -> 列出并提示确认 -> 删除填充文件。"""
     existing = list_existing_filler_files()
+    with LogBlock() as lb:
+        lb.add("【当前 mock 占用情况】")
+        lb.add("-" * 60)
+        if not existing:
+            lb.add("  当前未检测到本工具创建的填充文件，无需释放。")
+        for i, (path, size_bytes) in enumerate(existing, 1):
+            lb.add(f"  {i}. {path}")
+            lb.add(f"     占用空间: {size_bytes / (1024**3):.2f} GB")
+        lb.add("-" * 60)
+        if existing:
+            lb.add("")
     if not existing:
-        log("【当前 mock 占用情况】")
-        log("-" * 60)
-        log("  当前未检测到本工具创建的填充文件，无需释放。")
-        log("-" * 60)
         log_operation_end("释放检查已结束（无待释放文件）")
         return
 
-    log("【当前 mock 占用情况】")
-    log("-" * 60)
-    for i, (path, size_bytes) in enumerate(existing, 1):
-        size_gb = size_bytes / (1024**3)
-        log(f"  {i}. {path}")
-        log(f"     占用空间: {size_gb:.2f} GB")
-    log("-" * 60)
-    log("")
     if not confirm("确认删除以上填充文件以释放空间？(y/N): "):
         log("[取消] 已取消释放操作。")
         log_operation_end("释放已取消")
@@ -6,55 +6,98 @@
 
 from __future__ import annotations
 
+import ctypes
 import os
-import subprocess
 import sys
-from dataclasses import dataclass
-from typing import List, Optional
+import time
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass, field
+from typing import Dict, List, Optional
+
+
+_darwin_statfs = None  # 延迟加载的 libc statfs 函数
+
+# 分区列表缓存（秒），同一会话内挂载情况不会变化
+_PARTITIONS_CACHE_TTL = 1.0
+_partitions_cache: dict = {"t": 0.0, "v": None, "dev_index": None, "by_prefix": None}
+
+
+class _DarwinStatfs(ctypes.Structure):
+    """Darwin struct statfs（64 位 inode 版本，见 <sys/mount.h>）。"""
+
+    _fields_ = [
+        ("f_bsize", ctypes.c_uint32),
+        ("f_iosize", ctypes.c_int32),
+        ("f_blocks", ctypes.c_uint64),
+        ("f_bfree", ctypes.c_uint64),
+        ("f_bavail", ctypes.c_uint64),
+        ("f_files", ctypes.c_uint64),
+        ("f_ffree", ctypes.c_uint64),
+        ("f_fsid", ctypes.c_int32 * 2),
+        ("f_owner", ctypes.c_uint32),
+        ("f_type", ctypes.c_uint32),
+        ("f_flags", ctypes.c_uint32),
+        ("f_fssubtype", ctypes.c_uint32),
+        ("f_fstypename", ctypes.c_char * 16),
+        ("f_mntonname", ctypes.c_char * 1024),
+        ("f_mntfromname", ctypes.c_char * 1024),
+        ("f_flags_ext", ctypes.c_uint32),
+        ("f_reserved", ctypes.c_uint32 * 7),
+    ]
+
+
+def _load_darwin_statfs():
+    """加载 libc 中的 statfs；x86_64 上需使用 statfs$INODE64 符号以匹配 64 位结构体。"""
+    global _darwin_statfs
+    if _darwin_statfs is None:
+        libc = ctypes.CDLL("/usr/lib/libc.dylib", use_errno=True)
+        try:
+            func = libc["statfs$INODE64"]
+        except AttributeError:
+            func = libc.statfs
+        func.argtypes = [ctypes.c_char_p, ctypes.POINTER(_DarwinStatfs)]
+        func.restype = ctypes.c_int
+        _darwin_statfs = func
+    return _darwin_statfs
 
 
 def _get_mount_point_darwin(path: str) -> Optional[str]:
-    """Mac 上用 df 获取路径所在挂载点（与 df $HOME 一致，避免 st_dev 多卷相同）。"""
+    """Mac 上用 statfs(2) 获取路径所在挂载点（与 df $HOME 一致，避免 st_dev 多卷相同）。"""
     path = os.path.abspath(path)
     try:
-        out = subprocess.run(
-            ["df", "-P", path],
-            capture_output=True,
-            text=True,
-            timeout=5,
-        )
-        if out.returncode != 0 or not out.stdout:
-            return None
-        lines = out.stdout.strip().splitlines()
-        if len(lines) < 2:
-            return None
-        # 最后一行最后一列为挂载点
-        return lines[-1].split()[-1]
-    except (OSError, IndexError, subprocess.TimeoutExpired):
+        statfs = _load_darwin_statfs()
+    except (OSError, AttributeError):
+        return None
+    buf = _DarwinStatfs()
+    if statfs(os.fsencode(path), ctypes.byref(buf)) != 0:
         return None
+    return os.fsdecode(buf.f_mntonname) or None
 
 
-@dataclass
+@dataclass(frozen=True)
 class DiskPartition:
-    """单个分区/盘符信息"""
+    """单个分区/盘符信息（不可变，GB 等派生字段在构造时计算）"""
 
     mount_point: str  # 挂载点，如 "C:" 或 "/" 或 "/Users/xxx"
     total_bytes: int
     free_bytes: int
     used_bytes: int
     label: str = ""  # 可选标签，如 "本地磁盘"
+    # 以 GB 为单位的空间，构造时计算一次
+    total_gb: float = field(init=False, repr=False, compare=False)
+    free_gb: float = field(init=False, repr=False, compare=False)
+    used_gb: float = field(init=False, repr=False, compare=False)
+    # 规范化后以分隔符结尾的挂载点，用于路径前缀匹配
+    _mp_prefix: str = field(init=False, repr=False, compare=False)
 
-    @property
-    def total_gb(self) -> float:
-        return self.total_bytes / (1024**3)
-
-    @property
-    def free_gb(self) -> float:
-        return self.free_bytes / (1024**3)
-
-    @property
-    def used_gb(self) -> float:
-        return self.used_bytes / (1024**3)
+    def __post_init__(self) -> None:
+        # 实例不可变，派生字段需通过 object.__setattr__ 赋值
+        object.__setattr__(self, "total_gb", self.total_bytes / (1024**3))
+        object.__setattr__(self, "free_gb", self.free_bytes / (1024**3))
+        object.__setattr__(self, "used_gb", self.used_bytes / (1024**3))
+        object.__setattr__(
+            self, "_mp_prefix", os.path.normpath(self.mount_point).rstrip(os.sep) + os.sep
+        )
 
     def __str__(self, suffix: str = "") -> str:
         line = (
@@ -68,25 +111,39 @@ class DiskPartition:
         return line
 
 
+def _safe_usage(mountpoint: str):
+    """查询单个挂载点的空间占用，不可访问时返回 None。"""
+    import psutil
+
+    try:
+        return psutil.disk_usage(mountpoint)
+    except (PermissionError, OSError):
+        return None
+
+
 def _get_partitions_psutil() -> List[DiskPartition]:
-    """使用 psutil 获取所有分区（跨平台）。"""
+    """使用 psutil 获取所有分区（跨平台）。各挂载点并发查询，避免被慢速设备（如外接盘、网络盘）串行拖慢。"""
     import psutil
 
+    parts = list(psutil.disk_partitions(all=False))
+    if not parts:
+        return []
+    with ThreadPoolExecutor(max_workers=min(8, len(parts))) as executor:
+        usages = list(executor.map(_safe_usage, [part.mountpoint for part in parts]))
+
     result: List[DiskPartition] = []
-    for part in psutil.disk_partitions(all=False):
-        try:
-            usage = psutil.disk_usage(part.mountpoint)
-            result.append(
-                DiskPartition(
-                    mount_point=part.mountpoint,
-                    total_bytes=usage.total,
-                    free_bytes=usage.free,
-                    used_bytes=usage.used,
-                    label=getattr(part, "label", "") or "",
-                )
-            )
-        except (PermissionError, OSError):
+    for part, usage in zip(parts, usages):
+        if usage is None:
             continue
+        result.append(
+            DiskPartition(
+                mount_point=part.mountpoint,
+                total_bytes=usage.total,
+                free_bytes=usage.free,
+                used_bytes=usage.used,
+                label=getattr(part, "label", "") or "",
+            )
+        )
     return result
 
 
@@ -95,42 +152,38 @@ def _get_partitions_stdlib() -> List[DiskPartition]:
     result: List[DiskPartition] = []
 
     if sys.platform == "win32":
-        import string
+        # Windows：使用 ctypes 调用 GetLogicalDrives / GetDiskFreeSpaceExW
+        try:
+            kernel32 = ctypes.windll.kernel32  # type: ignore[attr-defined]
+        except AttributeError:
+            return result
+        # GetLogicalDrives 一次返回所有盘符的位掩码，无需逐个探测 A-Z
+        mask = kernel32.GetLogicalDrives()
+        letters = [chr(ord("A") + i) for i in range(26) if mask & (1 << i)]
 
-        for letter in string.ascii_uppercase:
+        for letter in letters:
             path = f"{letter}:\\"
-            if os.path.exists(path):
-                try:
-                    if sys.platform != "win32" and hasattr(os, "statvfs"):
-                        stat = os.statvfs(path)
-                        total = stat.f_frsize * stat.f_blocks
-                        free = stat.f_bavail * stat.f_frsize
-                        used = total - free
-                    else:
-                        # Windows：使用 ctypes 调用 GetDiskFreeSpaceExW
-                        import ctypes
-
-                        free_bytes = ctypes.c_ulonglong(0)
-                        total_bytes = ctypes.c_ulonglong(0)
-                        ctypes.windll.kernel32.GetDiskFreeSpaceExW(  # type: ignore[attr-defined]
-                            ctypes.c_wchar_p(path),
-                            None,
-                            ctypes.byref(total_bytes),
-                            ctypes.byref(free_bytes),
-                        )
-                        total = total_bytes.value
-                        free = free_bytes.value
-                        used = total - free
-                    result.append(
-                        DiskPartition(
-                            mount_point=path.rstrip("\\"),
-                            total_bytes=total,
-                            free_bytes=free,
-                            used_bytes=used,
-                        )
-                    )
-                except (OSError, AttributeError):
-                    continue
+            free_bytes = ctypes.c_ulonglong(0)
+            total_bytes = ctypes.c_ulonglong(0)
+            ok = kernel32.GetDiskFreeSpaceExW(
+                ctypes.c_wchar_p(path),
+                None,
+                ctypes.byref(total_bytes),
+                ctypes.byref(free_bytes),
+            )
+            if not ok:
+                # 盘符存在但不可访问（如光驱无盘）
+                continue
+            total = total_bytes.value
+            free = free_bytes.value
+            result.append(
+                DiskPartition(
+                    mount_point=path.rstrip("\\"),
+                    total_bytes=total,
+                    free_bytes=free,
+                    used_bytes=total - free,
+                )
+            )
     else:
         # Unix / macOS：常见挂载点
         for path in ["/", os.path.expanduser("~")]:
@@ -166,43 +219,79 @@ def _get_partitions_stdlib() -> List[DiskPartition]:
 
 
 def get_disk_partitions() -> List[DiskPartition]:
-    """获取当前机器上可用的磁盘分区列表（总空间、剩余空间）。"""
+    """获取当前机器上可用的磁盘分区列表（总空间、剩余空间）。结果缓存 1 秒，避免同一会话内重复扫描。"""
+    now = time.monotonic()
+    if _partitions_cache["v"] is not None and now - _partitions_cache["t"] < _PARTITIONS_CACHE_TTL:
+        return _partitions_cache["v"]
     try:
-        return _get_partitions_psutil()
+        result = _get_partitions_psutil()
     except ImportError:
-        return _get_partitions_stdlib()
+        result = _get_partitions_stdlib()
+    _partitions_cache["t"] = now
+    _partitions_cache["v"] = result
+    _partitions_cache["dev_index"] = None
+    _partitions_cache["by_prefix"] = None
+    return result
+
+
+def invalidate_disk_partitions_cache() -> None:
+    """清除分区列表缓存；填充或删除文件后调用，确保随后读取到最新空间信息。"""
+    _partitions_cache["t"] = 0.0
+    _partitions_cache["v"] = None
+    _partitions_cache["dev_index"] = None
+    _partitions_cache["by_prefix"] = None
+
+
+def _index_partitions(partitions: List[DiskPartition]) -> Dict[int, DiskPartition]:
+    """按挂载点 st_dev 建立 设备号 -> 分区 索引，相同设备号保留首个分区。"""
+    index: Dict[int, DiskPartition] = {}
+    for p in partitions:
+        try:
+            index.setdefault(os.stat(p.mount_point).st_dev, p)
+        except OSError:
+            continue
+    return index
+
+
+def _sort_by_prefix(partitions: List[DiskPartition]) -> List[DiskPartition]:
+    """按挂载点前缀长度降序排列，前缀匹配时首个命中即为最长匹配。"""
+    return sorted(partitions, key=lambda p: -len(p._mp_prefix))
+
+
+def _get_derived(partitions: List[DiskPartition], key: str, build):
+    """返回由分区列表派生的索引；对缓存中的列表只构建一次。"""
+    if partitions is not _partitions_cache["v"]:
+        return build(partitions)
+    if _partitions_cache[key] is None:
+        _partitions_cache[key] = build(partitions)
+    return _partitions_cache[key]
 
 
 def get_partition_by_path(path: str) -> Optional[DiskPartition]:
-    """根据路径获取其所在分区的信息。Mac 上用 df 获取挂载点（APFS 多卷同 st_dev 时准确）。"""
+    """根据路径获取其所在分区的信息。Mac 上用 statfs 获取挂载点（APFS 多卷同 st_dev 时准确）。"""
     path = os.path.abspath(path)
     partitions = get_disk_partitions()
     if sys.platform == "darwin":
         mp_str = _get_mount_point_darwin(path)
         if mp_str is not None:
+            mp_prefix = mp_str.rstrip(os.sep) + os.sep
             for p in partitions:
-                if p.mount_point == mp_str or p.mount_point.rstrip(os.sep) == mp_str.rstrip(os.sep):
+                if p.mount_point == mp_str or p._mp_prefix == mp_prefix:
                     return p
     try:
         path_dev = os.stat(path).st_dev
     except OSError:
         path_dev = None
     if path_dev is not None:
-        for p in partitions:
-            try:
-                if os.stat(p.mount_point).st_dev == path_dev:
-                    return p
-            except OSError:
-                continue
+        p = _get_derived(partitions, "dev_index", _index_partitions).get(path_dev)
+        if p is not None:
+            return p
     try:
         path = os.path.realpath(path)
     except OSError:
         pass
-    best: Optional[DiskPartition] = None
-    best_len = 0
-    for p in partitions:
-        mp = p.mount_point.rstrip(os.sep) + os.sep
-        if path.startswith(mp) and len(mp) > best_len:
-            best = p
-            best_len = len(mp)
-    return best
+    path_prefix = path.rstrip(os.sep) + os.sep
+    for p in _get_derived(partitions, "by_prefix", _sort_by_prefix):
+        if path_prefix.startswith(p._mp_prefix):
+            return p
+    return None
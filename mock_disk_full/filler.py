@@ -2,20 +2,26 @@
 """
 跨平台磁盘填充与释放模块。
 Windows: 在目标盘符下创建 FAKETMP\\fakefile.tmp 占满剩余空间。
-macOS: 在目标路径下创建 testfile，使用 dd 占满剩余空间（保留约 500MB + 10MB）。
+macOS / Linux: 在目标路径下创建 testfile，预分配磁盘块占满剩余空间（保留约 500MB + 10MB）。
 """
 
 from __future__ import annotations
 
+import errno
+import mmap
 import os
-import subprocess
+import stat
+import struct
 import sys
+from concurrent.futures import ThreadPoolExecutor
+from functools import lru_cache
 from typing import List, Optional, Tuple
 
 from .disk_info import (
     DiskPartition,
     get_disk_partitions,
     get_partition_by_path,
+    invalidate_disk_partitions_cache,
 )
 
 
@@ -27,6 +33,39 @@ FAKE_DIR = "FAKETMP"
 FAKE_FILENAME = "fakefile.tmp"
 MAC_FILENAME = "testfile"
 
+# 回退写入时每次写入的块大小（8 MiB）
+WRITE_CHUNK_BYTES = 8 * 1024 * 1024
+
+# 回退写入时的并发写请求数；小于 PARALLEL_WRITE_MIN_BYTES 时顺序写入即可
+WRITE_QUEUE_DEPTH = 32
+PARALLEL_WRITE_MIN_BYTES = 256 * 1024 * 1024
+
+# 回退写入绕过页缓存所需常量
+_F_NOCACHE = 48  # macOS <sys/fcntl.h>
+_FILE_FLAG_WRITE_THROUGH = 0x80000000
+_FILE_FLAG_NO_BUFFERING = 0x20000000
+
+# Windows 文件与权限 API 常量
+_kernel32 = None  # 延迟加载的 kernel32
+_GENERIC_WRITE = 0x40000000
+_CREATE_NEW = 1
+_CREATE_ALWAYS = 2
+_FILE_ATTRIBUTE_NORMAL = 0x80
+_FILE_BEGIN = 0
+_INVALID_HANDLE_VALUE = (1 << (8 * struct.calcsize("P"))) - 1
+_ERROR_INVALID_FUNCTION = 1
+_ERROR_NOT_SUPPORTED = 50
+_ERROR_NOT_ALL_ASSIGNED = 1300
+_TOKEN_ADJUST_PRIVILEGES = 0x0020
+_TOKEN_QUERY = 0x0008
+_SE_PRIVILEGE_ENABLED = 0x00000002
+
+# macOS fcntl(F_PREALLOCATE) 相关常量（见 <sys/fcntl.h>）
+_F_PREALLOCATE = 42
+_F_ALLOCATECONTIG = 0x00000002
+_F_ALLOCATEALL = 0x00000004
+_F_PEOFPOSMODE = 3
+
 
 def _is_windows() -> bool:
     return sys.platform == "win32"
@@ -36,8 +75,9 @@ def _is_macos() -> bool:
     return sys.platform == "darwin"
 
 
+@lru_cache(maxsize=64)
 def get_filler_file_path(mount_point: str) -> str:
-    """根据挂载点返回将要创建的填充文件路径（用于提示和删除）。"""
+    """根据挂载点返回将要创建的填充文件路径（用于提示和删除）。结果仅取决于挂载点，故做缓存。"""
     mount_point = os.path.normpath(mount_point).rstrip(os.sep)
     if _is_windows():
         # Windows: X:\FAKETMP\fakefile.tmp
@@ -65,23 +105,23 @@ def list_existing_filler_files() -> List[Tuple[str, int]]:
     """
     result: List[Tuple[str, int]] = []
     seen_paths: set = set()
+    home_part = get_partition_by_path(os.path.expanduser("~")) if _is_macos() else None
     for part in get_disk_partitions():
         paths_to_check = [get_actual_filler_path(part)]
         # Mac 上 $HOME 分区可能曾写在挂载点下，兼容旧文件
-        if _is_macos():
-            home_part = get_partition_by_path(os.path.expanduser("~"))
-            if home_part and part.mount_point == home_part.mount_point:
-                paths_to_check.append(get_filler_file_path(part.mount_point))
+        if home_part and part.mount_point == home_part.mount_point:
+            paths_to_check.append(get_filler_file_path(part.mount_point))
         for path in paths_to_check:
             if path in seen_paths:
                 continue
-            if os.path.isfile(path):
-                try:
-                    size = os.path.getsize(path)
-                    result.append((path, size))
-                    seen_paths.add(path)
-                except OSError:
-                    continue
+            # 一次 stat 同时判断是否为普通文件并取得大小
+            try:
+                st = os.stat(path)
+            except OSError:
+                continue
+            if stat.S_ISREG(st.st_mode):
+                result.append((path, st.st_size))
+                seen_paths.add(path)
     return result
 
 
@@ -113,10 +153,236 @@ def fill_disk(
     filler_path = get_actual_filler_path(part)
 
     if _is_windows():
-        return _fill_windows(part.mount_point, filler_path, fill_mb, log_print)
-    if _is_macos() or sys.platform != "win32":
-        return _fill_unix(part.mount_point, filler_path, fill_mb, log_print)
-    return False, "当前操作系统暂不支持自动填充，请手动操作。"
+        result = _fill_windows(part.mount_point, filler_path, fill_mb, log_print)
+    elif _is_macos() or sys.platform != "win32":
+        result = _fill_unix(part.mount_point, filler_path, fill_mb, log_print)
+    else:
+        return False, "当前操作系统暂不支持自动填充，请手动操作。"
+    # 剩余空间已变化，使分区缓存失效
+    invalidate_disk_partitions_cache()
+    return result
+
+
+def _get_kernel32():
+    """延迟加载 kernel32 并声明用到的函数签名（仅 Windows）。"""
+    global _kernel32
+    if _kernel32 is None:
+        import ctypes
+        from ctypes import wintypes
+
+        k = ctypes.WinDLL("kernel32", use_last_error=True)  # type: ignore[attr-defined]
+        k.CreateFileW.argtypes = [
+            wintypes.LPCWSTR,
+            wintypes.DWORD,
+            wintypes.DWORD,
+            wintypes.LPVOID,
+            wintypes.DWORD,
+            wintypes.DWORD,
+            wintypes.HANDLE,
+        ]
+        k.CreateFileW.restype = wintypes.HANDLE
+        k.SetFilePointerEx.argtypes = [
+            wintypes.HANDLE,
+            wintypes.LARGE_INTEGER,
+            ctypes.POINTER(wintypes.LARGE_INTEGER),
+            wintypes.DWORD,
+        ]
+        k.SetFilePointerEx.restype = wintypes.BOOL
+        k.SetEndOfFile.argtypes = [wintypes.HANDLE]
+        k.SetEndOfFile.restype = wintypes.BOOL
+        k.SetFileValidData.argtypes = [wintypes.HANDLE, wintypes.LARGE_INTEGER]
+        k.SetFileValidData.restype = wintypes.BOOL
+        k.CloseHandle.argtypes = [wintypes.HANDLE]
+        k.CloseHandle.restype = wintypes.BOOL
+        k.GetCurrentProcess.argtypes = []
+        k.GetCurrentProcess.restype = wintypes.HANDLE
+        _kernel32 = k
+    return _kernel32
+
+
+def _create_file_windows(path: str, disposition: int, flags: int) -> int:
+    """Windows: 调用 CreateFileW 以独占写方式打开文件，失败时抛出 OSError。"""
+    import ctypes
+
+    handle = _get_kernel32().CreateFileW(path, _GENERIC_WRITE, 0, None, disposition, flags, None)
+    if handle is None or handle == _INVALID_HANDLE_VALUE:
+        raise ctypes.WinError(ctypes.get_last_error())  # type: ignore[attr-defined]
+    return handle
+
+
+def _enable_manage_volume_privilege() -> bool:
+    """Windows: 尝试为当前进程启用 SeManageVolumePrivilege（需管理员），成功后方可调用 SetFileValidData。"""
+    import ctypes
+    from ctypes import wintypes
+
+    class LUID(ctypes.Structure):
+        _fields_ = [("LowPart", wintypes.DWORD), ("HighPart", wintypes.LONG)]
+
+    class TOKEN_PRIVILEGES(ctypes.Structure):
+        # 仅含一个 LUID_AND_ATTRIBUTES 元素
+        _fields_ = [
+            ("PrivilegeCount", wintypes.DWORD),
+            ("Luid", LUID),
+            ("Attributes", wintypes.DWORD),
+        ]
+
+    kernel32 = _get_kernel32()
+    advapi32 = ctypes.WinDLL("advapi32", use_last_error=True)  # type: ignore[attr-defined]
+    advapi32.OpenProcessToken.argtypes = [
+        wintypes.HANDLE,
+        wintypes.DWORD,
+        ctypes.POINTER(wintypes.HANDLE),
+    ]
+    advapi32.OpenProcessToken.restype = wintypes.BOOL
+    advapi32.LookupPrivilegeValueW.argtypes = [
+        wintypes.LPCWSTR,
+        wintypes.LPCWSTR,
+        ctypes.POINTER(LUID),
+    ]
+    advapi32.LookupPrivilegeValueW.restype = wintypes.BOOL
+    advapi32.AdjustTokenPrivileges.argtypes = [
+        wintypes.HANDLE,
+        wintypes.BOOL,
+        ctypes.POINTER(TOKEN_PRIVILEGES),
+        wintypes.DWORD,
+        wintypes.LPVOID,
+        wintypes.LPVOID,
+    ]
+    advapi32.AdjustTokenPrivileges.restype = wintypes.BOOL
+
+    token = wintypes.HANDLE()
+    if not advapi32.OpenProcessToken(
+        kernel32.GetCurrentProcess(),
+        _TOKEN_ADJUST_PRIVILEGES | _TOKEN_QUERY,
+        ctypes.byref(token),
+    ):
+        return False
+    try:
+        tp = TOKEN_PRIVILEGES(1, LUID(), _SE_PRIVILEGE_ENABLED)
+        if not advapi32.LookupPrivilegeValueW(None, "SeManageVolumePrivilege", ctypes.byref(tp.Luid)):
+            return False
+        if not advapi32.AdjustTokenPrivileges(token, False, ctypes.byref(tp), 0, None, None):
+            return False
+        # 非管理员时调用本身成功，但返回 ERROR_NOT_ALL_ASSIGNED
+        return ctypes.get_last_error() != _ERROR_NOT_ALL_ASSIGNED
+    finally:
+        kernel32.CloseHandle(token)
+
+
+def _allocate_windows(file_path: str, size_bytes: int) -> bool:
+    """
+    Windows: CreateFileW + SetFilePointerEx + SetEndOfFile 直接分配 size_bytes 字节（与 fsutil file createnew 相同），
+    有管理员权限时再调用 SetFileValidData 跳过系统的延迟清零。文件系统不支持时返回 False。
+    """
+    import ctypes
+
+    kernel32 = _get_kernel32()
+    handle = _create_file_windows(file_path, _CREATE_NEW, _FILE_ATTRIBUTE_NORMAL)
+    try:
+        if not kernel32.SetFilePointerEx(handle, size_bytes, None, _FILE_BEGIN) or not kernel32.SetEndOfFile(handle):
+            err = ctypes.get_last_error()
+            if err not in (_ERROR_INVALID_FUNCTION, _ERROR_NOT_SUPPORTED):
+                raise ctypes.WinError(err)  # type: ignore[attr-defined]
+            kernel32.CloseHandle(handle)
+            return False
+        if _enable_manage_volume_privilege():
+            # 失败不影响已分配的空间，忽略即可
+            kernel32.SetFileValidData(handle, size_bytes)
+    except BaseException:
+        kernel32.CloseHandle(handle)
+        # 删除本次创建的残留文件
+        try:
+            os.remove(file_path)
+        except OSError:
+            pass
+        raise
+    kernel32.CloseHandle(handle)
+    return True
+
+
+def _open_unbuffered_windows(path: str) -> int:
+    """Windows: 以 FILE_FLAG_NO_BUFFERING | FILE_FLAG_WRITE_THROUGH 创建文件，返回 CRT 文件描述符。"""
+    import msvcrt
+
+    handle = _create_file_windows(
+        path,
+        _CREATE_ALWAYS,
+        _FILE_FLAG_NO_BUFFERING | _FILE_FLAG_WRITE_THROUGH,
+    )
+    try:
+        return msvcrt.open_osfhandle(handle, 0)  # type: ignore[attr-defined]
+    except BaseException:
+        # 未转换为文件描述符的句柄需自行关闭，否则文件保持独占锁定无法删除
+        _get_kernel32().CloseHandle(handle)
+        raise
+
+
+def _open_unbuffered(path: str) -> int:
+    """
+    以绕过系统页缓存的方式创建文件，返回文件描述符。
+    Linux 使用 O_DIRECT（文件系统不支持时退回普通写入），macOS 使用 F_NOCACHE，
+    Windows 使用 FILE_FLAG_NO_BUFFERING | FILE_FLAG_WRITE_THROUGH。
+    """
+    if _is_windows():
+        return _open_unbuffered_windows(path)
+    flags = os.O_WRONLY | os.O_CREAT | os.O_TRUNC
+    o_direct = getattr(os, "O_DIRECT", 0)
+    if o_direct:
+        try:
+            return os.open(path, flags | o_direct, 0o644)
+        except OSError as e:
+            # 如 tmpfs 不支持 O_DIRECT
+            if e.errno != errno.EINVAL:
+                raise
+    fd = os.open(path, flags, 0o644)
+    if _is_macos():
+        import fcntl
+
+        try:
+            fcntl.fcntl(fd, getattr(fcntl, "F_NOCACHE", _F_NOCACHE), 1)
+        except OSError:
+            pass
+    return fd
+
+
+def _pwrite_zeros(fd: int, view: memoryview, size_bytes: int) -> None:
+    """多线程并发 pwrite 零缓冲区，使设备同时保持最多 WRITE_QUEUE_DEPTH 个在途写请求。"""
+    chunk = len(view)
+    offsets = range(0, size_bytes, chunk)
+    depth = min(WRITE_QUEUE_DEPTH, len(offsets))
+
+    def worker(start: int) -> None:
+        # 各线程按步长 depth 交错负责各块，互不重叠
+        for offset in offsets[start::depth]:
+            n = min(chunk, size_bytes - offset)
+            done = 0
+            while done < n:
+                done += os.pwrite(fd, view[done:n], offset + done)
+
+    with ThreadPoolExecutor(max_workers=depth) as executor:
+        list(executor.map(worker, range(depth)))
+
+
+def _write_zeros(file_path: str, size_bytes: int) -> None:
+    """以可复用的 8 MiB 零缓冲区绕过页缓存循环写入 size_bytes 字节并 fsync，确保真正占用磁盘块（非稀疏文件）。"""
+    # 匿名 mmap 按页对齐且内容为零，满足 O_DIRECT / NO_BUFFERING 的对齐要求
+    buf = mmap.mmap(-1, WRITE_CHUNK_BYTES)
+    view = memoryview(buf)
+    try:
+        fd = _open_unbuffered(file_path)
+        try:
+            if hasattr(os, "pwrite") and size_bytes >= PARALLEL_WRITE_MIN_BYTES:
+                _pwrite_zeros(fd, view, size_bytes)
+            else:
+                remaining = size_bytes
+                while remaining:
+                    remaining -= os.write(fd, view[: min(WRITE_CHUNK_BYTES, remaining)])
+            os.fsync(fd)
+        finally:
+            os.close(fd)
+    finally:
+        view.release()
+        buf.close()
 
 
 def _fill_windows(
@@ -125,41 +391,72 @@ def _fill_windows(
     size_mb: int,
     log_print,
 ) -> Tuple[bool, str]:
-    """Windows: 创建 FAKETMP 目录，使用 fsutil 创建大文件。"""
+    """Windows: 创建 FAKETMP 目录，通过 Win32 API 直接分配大文件。"""
     dir_path = os.path.dirname(file_path)
+    # 父目录为盘符根目录，直接 mkdir 即可，省去 makedirs 的逐级 stat
     try:
-        os.makedirs(dir_path, exist_ok=True)
+        os.mkdir(dir_path)
         log_print(f"[信息] 已创建目录: {dir_path}")
+    except FileExistsError:
+        pass
     except OSError as e:
         return False, f"创建目录失败: {e}"
 
     size_bytes = size_mb * 1024 * 1024
+    writing = False
     try:
-        # fsutil file createnew <path> <length> 可快速创建空洞文件
-        ret = subprocess.run(
-            ["fsutil", "file", "createnew", file_path, str(size_bytes)],
-            capture_output=True,
-            text=True,
-            timeout=60,
-        )
-        if ret.returncode != 0:
-            err = (ret.stderr or ret.stdout or "").strip()
-            return False, f"fsutil 执行失败: {err}"
-        log_print(f"[信息] 已创建填充文件: {file_path}，大小约 {size_mb} MB")
-        return True, file_path
-    except FileNotFoundError:
-        # 无 fsutil 时回退：用 Python 写文件（较慢）
-        log_print("[信息] 未找到 fsutil，使用 Python 写入（可能较慢）...")
+        if not _allocate_windows(file_path, size_bytes):
+            log_print("[信息] 当前文件系统不支持直接分配，使用 Python 写入（可能较慢）...")
+            writing = True
+            _write_zeros(file_path, size_bytes)
+    except OSError as e:
+        # 写入中途失败时删除已写入的部分文件，避免磁盘被占满却报告失败；
+        # _allocate_windows 失败时已自行清理（且 CREATE_NEW 失败时不能删除原有文件）
+        if writing:
+            try:
+                os.remove(file_path)
+            except OSError:
+                pass
+        return False, f"创建填充文件失败: {e}"
+    log_print(f"[信息] 已创建填充文件: {file_path}，大小约 {size_mb} MB")
+    return True, file_path
+
+
+def _preallocate_darwin(fd: int, size_bytes: int) -> None:
+    """macOS: 通过 fcntl(F_PREALLOCATE) 预分配磁盘块，再 ftruncate 设置文件长度。"""
+    import fcntl
+
+    f_preallocate = getattr(fcntl, "F_PREALLOCATE", _F_PREALLOCATE)
+    # 优先申请连续空间，失败后退回非连续分配
+    for flags in (_F_ALLOCATECONTIG | _F_ALLOCATEALL, _F_ALLOCATEALL):
+        # struct fstore { fst_flags; fst_posmode; fst_offset; fst_length; fst_bytesalloc; }
+        fstore = struct.pack("IiqqQ", flags, _F_PEOFPOSMODE, 0, size_bytes, 0)
         try:
-            with open(file_path, "wb") as f:
-                f.seek(size_bytes - 1)
-                f.write(b"\x00")
-            log_print(f"[信息] 已创建填充文件: {file_path}，大小约 {size_mb} MB")
-            return True, file_path
+            fcntl.fcntl(fd, f_preallocate, fstore)
+            break
+        except OSError:
+            if flags == _F_ALLOCATEALL:
+                raise
+    os.ftruncate(fd, size_bytes)
+
+
+def _preallocate(file_path: str, size_bytes: int) -> bool:
+    """创建文件并预分配 size_bytes 字节磁盘块；当前系统或文件系统不支持预分配时返回 False。"""
+    with open(file_path, "wb") as f:
+        fd = f.fileno()
+        if not _is_macos() and not hasattr(os, "posix_fallocate"):
+            return False
+        try:
+            if _is_macos():
+                # 如 SMB / NFS 等网络卷不支持 F_PREALLOCATE
+                _preallocate_darwin(fd, size_bytes)
+            else:
+                os.posix_fallocate(fd, 0, size_bytes)
         except OSError as e:
-            return False, f"创建填充文件失败: {e}"
-    except subprocess.TimeoutExpired:
-        return False, "创建文件超时。"
+            if e.errno in (errno.ENOTSUP, errno.EOPNOTSUPP, errno.EINVAL):
+                return False
+            raise
+        return True
 
 
 def _fill_unix(
@@ -168,32 +465,25 @@ def _fill_unix(
     size_mb: int,
     log_print,
 ) -> Tuple[bool, str]:
-    """macOS / Unix: 使用 dd 创建填充文件。"""
-    # dd if=/dev/zero of=file bs=1m count=N
+    """macOS / Unix: 预分配磁盘块创建填充文件（Linux 用 posix_fallocate，macOS 用 F_PREALLOCATE），无需逐字节写入。"""
+    size_bytes = size_mb * 1024 * 1024
+    log_print(f"[信息] 预分配约 {size_mb} MB 到 {file_path}")
     try:
-        # 1m = 1MB，兼容 macOS (BSD dd) 与 Linux (GNU dd)
-        cmd = [
-            "dd",
-            "if=/dev/zero",
-            f"of={file_path}",
-            "bs=1m",
-            f"count={size_mb}",
-        ]
-        log_print(f"[信息] 执行: dd 写入约 {size_mb} MB 到 {file_path}")
-        ret = subprocess.run(cmd, capture_output=True, text=True, timeout=3600)
-        if ret.returncode != 0:
-            err = (ret.stderr or ret.stdout or "").strip()
-            return False, f"dd 执行失败: {err}"
-        if os.path.isfile(file_path):
-            size_actual = os.path.getsize(file_path)
-            log_print(f"[信息] 已创建填充文件: {file_path}，大小约 {size_actual // (1024*1024)} MB")
-            return True, file_path
-        return False, "dd 未生成目标文件。"
-    except FileNotFoundError:
-        return False, "未找到 dd 命令，请确保在 Unix/macOS 环境下运行。"
+        if not _preallocate(file_path, size_bytes):
+            log_print("[信息] 当前文件系统不支持预分配，使用 Python 写入（可能较慢）...")
+            _write_zeros(file_path, size_bytes)
     except OSError as e:
+        # 预分配失败时删除残留的空文件，避免被误认为已填充
+        try:
+            os.remove(file_path)
+        except OSError:
+            pass
         return False, f"创建填充文件失败: {e}"
 
+    size_actual = os.path.getsize(file_path)
+    log_print(f"[信息] 已创建填充文件: {file_path}，大小约 {size_actual // (1024*1024)} MB")
+    return True, file_path
+
 
 def remove_filler_file(file_path: str, log_print=None) -> Tuple[bool, str]:
     """
@@ -211,6 +501,7 @@ def remove_filler_file(file_path: str, log_print=None) -> Tuple[bool, str]:
 
     try:
         os.remove(file_path)
+        invalidate_disk_partitions_cache()
         log_print(f"[信息] 已删除填充文件: {file_path}")
         # Windows: 若 FAKETMP 为空，可顺带删除目录（可选）
         if _is_windows():